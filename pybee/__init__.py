@@ -13,28 +13,58 @@ This package provides high-level utilities for:
 # Import public API from submodules
 
 from .ssh import ssh_connection, run_shell, run_shell_blocking
-from .core import beeline_session, run_sql
+from .core import beeline_session, run_sql, run_sql_batch, close_session, parse_beeline_table
 from .fileops import upload_file, download_file, df_to_Table, table_to_df, download_df
 from .utils import alert, text_to_df, to_sql_inlist, todayx, this_monthx, export, daypartitions, daypartitions_to_sec, set_env
 # from .meta import confirm_table_size
-try:
-    from .ipython import register_sql_magic
-    register_sql_magic()
-except:
-    pass  # Ignore IPython magic registration in non-IPython environments
+import sys
+# Only register the SQL magic when running under IPython (it is already imported there)
+if "IPython" in sys.modules:
+    try:
+        from .ipython import register_sql_magic
+        register_sql_magic()
+    except Exception:
+        pass  # Ignore IPython magic registration failures
 
 __all__ = [
     'ssh_connection', 'run_shell', 'run_shell_blocking',
-    'beeline_session', 'run_sql',
+    'beeline_session', 'run_sql', 'run_sql_batch', 'close_session', 'parse_beeline_table',
     'upload_file', 'download_file', 'df_to_Table', 'table_to_df', 'download_df',
     'alert', 'text_to_df', 'to_sql_inlist', 'todayx', 'this_monthx', 'export', 'daypartitions', 'daypartitions_to_sec', 'set_env',
     'register_sql_magic', 'confirm_table_size'
 ]
 
-# Inject current date values as global constants for convenience
+# Current date values (days/months since 1970), computed on each access as `pybee.today`
+# and `pybee.this_month` so that long-running kernels stay correct across midnight
 from datetime import datetime
 import builtins
+import types
 
-# Define `today` and `this_month` as global constants (days/months since 1970)
-builtins.today = (datetime.now() - datetime(1970, 1, 1)).days
-builtins.this_month = (datetime.now().year - 1970) * 12 + datetime.now().month - 1
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _today():
+    return (datetime.now() - _EPOCH).days
+
+
+def _this_month():
+    now = datetime.now()
+    return (now.year - 1970) * 12 + now.month - 1
+
+
+class _PybeeModule(types.ModuleType):
+    @property
+    def today(self):
+        return _today()
+
+    @property
+    def this_month(self):
+        return _this_month()
+
+
+sys.modules[__name__].__class__ = _PybeeModule
+
+# Bare `today` and `this_month` names are kept for existing notebooks and snippets;
+# these are fixed at import time, use `pybee.today` / `pybee.this_month` for live values
+builtins.today = _today()
+builtins.this_month = _this_month()
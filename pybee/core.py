@@ -1,15 +1,62 @@
 import os
 import re
+import sys
+import codecs
+import atexit
+import hashlib
 import time
+import select
+import selectors
+import threading
 import datetime
+from collections import OrderedDict
+from functools import lru_cache
+from io import StringIO
 from pathlib import Path
 
+import pandas as pd # type: ignore
+
 from .ssh import ssh_connection
 from .utils import clean_sql, alert
 from .config import BEELINE_CONFIG
 
+# Result-table border lines (e.g. "+-----+------+")
+_SEP_RE = re.compile(rb"(?m)^[ \t]*\+[-+]*-[-+]*\+?[ \t]*\r?$")
+
+# Row summary printed by Beeline after a result table (e.g. "10 rows selected")
+# or a DML/DDL statement (e.g. "3 rows affected", "No rows affected")
+_ROWS_LINE = re.compile(
+    rb"(?m)^[ \t]*(?:(?:\d{1,3}(?:,\d{3})+|\d+)\srows selected|No rows selected|1 row selected"
+    rb"|(?:\d{1,3}(?:,\d{3})+|\d+)\srows? affected|No rows affected)[^\n]*"
+)
+
+# Lines that mark the end of a statement's output, and Beeline's prompt, which is printed
+# before each new statement is read. Markers are anchored to line starts so that progress
+# rows or echoed SQL containing these words do not end the read early.
+_EVENT_RE = re.compile(
+    rb"(?m)(?P<prompt>jdbc:[^\r\n]*?> )"
+    rb"|^(?P<done>\d[\d,]*\srows? (?:selected|affected)|No rows (?:selected|affected)|Error)"
+)
+
+# Beeline's idle prompt (e.g. "0: jdbc:hive2://host:10000/db> ") as the last thing received,
+# meaning every statement sent has finished and nothing more is on its way
+_IDLE_RE = re.compile(rb"jdbc:[^\r\n]*?> ?\s*\Z")
+
+# Seconds to wait for the idle prompt after the last expected marker before giving up
+# on reusing the session
+_PROMPT_WAIT = 2.0
+
+
+@lru_cache(maxsize=1)
+def _cfg():
+    """
+    Return BEELINE_CONFIG, read from disk once per process.
+    Call `_cfg.cache_clear()` after the config file changes.
+    """
+    return BEELINE_CONFIG()
+
 def beeline_session(shell, queue_name=None, timeout=10):
-    config = BEELINE_CONFIG()
+    config = _cfg()
     env_path = config.get("env_path", "")
     keytab_path = config.get("keytab_path", "")
     user = config.get("user", "")
@@ -21,108 +68,496 @@ def beeline_session(shell, queue_name=None, timeout=10):
         beeline_command = f"source {env_path}; kinit -kt {keytab_path} {user}; {beeline_path};"
 
     shell.send(beeline_command + "\n")
-    output = ''
+    buf = bytearray()
     start_time = time.time()
     while True:
-        if shell.recv_ready():
-            new_data = shell.recv(65535).decode('utf-8')
-            output += new_data
-            if "Connecting to jdbc:fiber" in new_data:
-                break
-        if time.time() - start_time > timeout:
+        remaining = timeout - (time.time() - start_time)
+        if remaining <= 0:
+            break
+        # Block until the channel is readable instead of sleep-polling recv_ready()
+        readable, _, _ = select.select([shell.fileno()], [], [], remaining)
+        if not readable:
+            break
+        new_data = shell.recv(65535)
+        if not new_data:
+            break
+        buf.extend(new_data)
+        # Include a small overlap so a marker split across two chunks is still seen
+        if b"Connecting to jdbc:fiber" in buf[-(len(new_data) + 32):]:
             break
-        time.sleep(0.1)
 
 def extract_query_output(output):
-    output = output.replace('\r\n', '\n')
-    lines = output.splitlines()
-
-    # Locate the start of the result table (first "+---" line)
-    table_start_idx = next((i for i, line in enumerate(lines) if line.strip().startswith("+") and "-" in line), None)
-    if table_start_idx is None:
-        return output.strip(), ""
-
-    # Locate the last "+---" line which ends the table
-    table_end_idx = None
-    for i in range(len(lines) - 1, -1, -1):
-        if lines[i].strip().startswith("+") and "-" in lines[i]:
-            table_end_idx = i
-            break
+    """
+    Split raw Beeline output into the result table and the row summary line.
+
+    Works directly on the bytes received from the channel so that large outputs
+    are scanned by the regex engine without building a list of lines.
+
+    Args:
+        output (bytes, bytearray or str): Raw Beeline output.
+
+    Returns:
+        tuple: (table_output, rows_line) as strings. If no table is found, the whole
+               output is returned with an empty rows_line.
+    """
+    if isinstance(output, str):
+        output = output.encode('utf-8')
+
+    # The first "+---" line starts the result table and the last one ends it
+    first = last = None
+    for match in _SEP_RE.finditer(output):
+        if first is None:
+            first = match
+        last = match
+    if first is None:
+        # No table (e.g. DML/DDL); the summary may still report "N rows affected"
+        rows_match = _ROWS_LINE.search(output)
+        rows_line = _decode(rows_match.group(0)).strip() if rows_match else ""
+        return _decode(output).strip(), rows_line
 
     # Find the row summary (e.g., "10 rows selected") after table end
-    rows_line = ""
-    if table_end_idx is not None:
-        for i in range(table_end_idx + 1, len(lines)):
-            if re.match(r"^\d+\srows selected|No rows selected|1 row selected", lines[i].strip()):
-                rows_line = lines[i].strip()
-                break
+    rows_match = _ROWS_LINE.search(output, last.end())
+    rows_line = _decode(rows_match.group(0)).strip() if rows_match else ""
 
-    table_output = "\n".join(lines[table_start_idx:table_end_idx + 1])
+    table_output = _decode(output[first.start():last.end()])
     return table_output.strip(), rows_line
 
 
-def run_sql(sql_query, queue_name=None, io=True, timeout=0, log_enabled=True):
-    if queue_name is None:
-        queue_name = BEELINE_CONFIG().get("DEFAULT_QUEUE", "")
+def _decode(data):
+    return bytes(data).decode('utf-8', errors='replace').replace('\r\n', '\n')
+
+
+def _is_border(line):
+    stripped = line.strip()
+    return stripped.startswith("+") and "-" in stripped and not stripped.strip("+-")
+
+
+def parse_beeline_table(text):
+    """
+    Parse a Beeline ASCII result table (as returned by run_sql) into a DataFrame.
+
+    Column boundaries are taken from the "+" positions of the first border line and the
+    rows are read with pandas' fixed-width parser. All values are returned as strings.
+
+    Args:
+        text (str): Table text including its "+---+" border lines.
+
+    Returns:
+        pd.DataFrame: DataFrame with the table header as columns.
+    """
+    lines = text.replace('\r\n', '\n').split('\n')
+    border = next((line for line in lines if _is_border(line)), None)
+    if border is None:
+        return pd.DataFrame()
+
+    # "|" separators sit under the "+" corners of the border line
+    corners = [i for i, char in enumerate(border) if char == "+"]
+    colspecs = [(start + 1, end) for start, end in zip(corners, corners[1:])]
+    body = "\n".join(line for line in lines if line.strip() and not _is_border(line))
+
+    return pd.read_fwf(StringIO(body), colspecs=colspecs, header=0, dtype=str, keep_default_na=False)
+
+
+# Open log file handles keyed by path; the path changes daily, which rotates the handle
+_log_handles = {}
+
+# Log directories already created in this process
+_ensured_dirs = set()
+
+
+def _log_file(path):
+    fh = _log_handles.get(path)
+    if fh is None or fh.closed:
+        _close_log_files()
+        fh = open(path, "a", encoding="utf-8", buffering=65536)
+        _log_handles[path] = fh
+    return fh
+
+
+def _close_log_files():
+    for fh in _log_handles.values():
+        fh.close()
+    _log_handles.clear()
+
+
+atexit.register(_close_log_files)
+
+
+# Per-thread SSH client and Beeline shell reused across run_sql calls
+_SESSION = threading.local()
+
+
+def _get_shell(queue_name):
+    """
+    Return the pooled Beeline shell for this thread, opening a new SSH connection and
+    Beeline session if there is none, it has closed, or a different queue is requested.
+    """
+    shell = getattr(_SESSION, "shell", None)
+    if shell is None or shell.closed or shell.exit_status_ready() or _SESSION.queue != queue_name:
+        close_session()
+        ssh_client, shell = ssh_connection()
+        beeline_session(shell, queue_name)
+        _SESSION.ssh, _SESSION.shell, _SESSION.queue = ssh_client, shell, queue_name
+    return shell
+
+
+def close_session():
+    """
+    Close the pooled SSH/Beeline session of the current thread, if one is open.
+    The next run_sql call opens a fresh session.
+    """
+    shell = getattr(_SESSION, "shell", None)
+    if shell is not None:
+        shell.close()
+        _SESSION.ssh.close()
+    _SESSION.ssh = _SESSION.shell = _SESSION.queue = _SESSION.database = None
+
+
+atexit.register(close_session)
+
+
+# Opt-in cache of query results: key -> (stored_at, query_output, rows), oldest first
+_QUERY_CACHE = OrderedDict()
+_QUERY_CACHE_SIZE = 128
+_QUERY_CACHE_TTL = 600  # seconds
+
+# Only single read-only statements are cached, and never ones whose result depends on when they run
+_CACHEABLE_RE = re.compile(r"^\s*(?:select|with|show|desc|describe)\b", re.IGNORECASE)
+_WRITE_RE = re.compile(
+    r"\b(?:insert|update|delete|merge|upsert|drop|create|alter|truncate|load|use|set|reset|"
+    r"grant|revoke|msck|analyze|refresh|export|import|lock|unlock|add|reload)\b",
+    re.IGNORECASE,
+)
+_NONDETERMINISTIC_RE = re.compile(
+    r"\b(?:now|current_date|current_timestamp|unix_timestamp|rand|uuid)\b", re.IGNORECASE
+)
+_USE_RE = re.compile(r"^use\s+`?(\w+)`?\s*;?$", re.IGNORECASE)
+
+
+def _is_read_only(sql_query):
+    """Return True if the cleaned query is a single statement that cannot change any state."""
+    return (_CACHEABLE_RE.match(sql_query) is not None
+            and ";" not in sql_query.rstrip().rstrip(";")
+            and not _WRITE_RE.search(sql_query))
+
+
+def _cache_key(sql_query):
+    """Return the cache key for a cleaned query, or None if it must not be cached."""
+    if not _is_read_only(sql_query) or _NONDETERMINISTIC_RE.search(sql_query):
+        return None
+    # The session's current database (set by USE) decides what unqualified names refer to
+    database = getattr(_SESSION, "database", None) or ""
+    key = f"{database}\n{sql_query}"
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _track_statement(sql_query, shell, failed):
+    """
+    Update cache state after a statement was sent: anything that is not read-only may
+    change data or session state, so cached results are dropped, and a successful USE
+    on a still-open session records its new current database.
+    """
+    if _is_read_only(sql_query):
+        return
+    _QUERY_CACHE.clear()
+    match = _USE_RE.match(sql_query)
+    if match and not failed and getattr(_SESSION, "shell", None) is shell:
+        _SESSION.database = match.group(1).lower()
 
-    ssh_client, shell = ssh_connection()
-    beeline_session(shell, queue_name)
 
+def _cache_get(key):
+    entry = _QUERY_CACHE.get(key)
+    if entry is None:
+        return None
+    stored_at, query_output, rows = entry
+    if time.time() - stored_at > _QUERY_CACHE_TTL:
+        del _QUERY_CACHE[key]
+        return None
+    _QUERY_CACHE.move_to_end(key)
+    return query_output, rows
+
+
+def _cache_put(key, query_output, rows):
+    _QUERY_CACHE[key] = (time.time(), query_output, rows)
+    _QUERY_CACHE.move_to_end(key)
+    while len(_QUERY_CACHE) > _QUERY_CACHE_SIZE:
+        _QUERY_CACHE.popitem(last=False)
+
+
+def _read_results(shell, expected=1, timeout=0, stream_decoder=None):
+    """
+    Read from the Beeline shell until `expected` completion markers have been seen.
+
+    The pooled session is kept only if exactly `expected` markers arrived and Beeline's
+    idle prompt was read back after the last one; otherwise leftover output could leak
+    into the next query, so the session is closed.
+
+    Returns:
+        tuple: (buf, ends) where `buf` is the raw output and `ends` holds, for each
+               completed statement, the offset just past its completion marker line.
+    """
+    buf = bytearray()
+    ends = []
+    scanned = 0  # Offset past the last event found, so no marker is counted twice
+    error_open = False  # Last marker was an "Error" line with no prompt seen since
+    start_time = time.time()
+    prompt_deadline = None
+    # Register the channel once; prefer epoll where the platform has it
+    sel = getattr(selectors, "EpollSelector", selectors.DefaultSelector)()
+    sel.register(shell.fileno(), selectors.EVENT_READ)
+    # Only statements that ran to completion leave the pooled session reusable;
+    # on timeout, a closed channel, extra output or an interrupt the session is discarded
+    session_usable = False
+    try:
+        while True:
+            remaining = None
+            if timeout > 0 and prompt_deadline is None:
+                remaining = timeout - (time.time() - start_time)
+                if remaining <= 0:
+                    print("Timeout reached, exiting loop.")
+                    alert()
+                    break
+            elif prompt_deadline is not None:
+                remaining = prompt_deadline - time.time()
+                if remaining <= 0:
+                    break  # Results are complete, but Beeline never went idle
+            if not sel.select(timeout=remaining):
+                continue
+            # Only the newly received bytes (plus enough overlap for a split prompt) need scanning
+            scan_from = max(scanned, len(buf) - 512)
+            # Drain everything already buffered by paramiko before waiting again
+            channel_closed = False
+            while True:
+                new_data = shell.recv(65535)
+                if not new_data:
+                    channel_closed = True  # Channel closed by the remote end
+                    break
+                buf.extend(new_data)
+                if stream_decoder is not None:
+                    sys.stdout.write(stream_decoder.decode(new_data).replace('\r\n', '\n'))
+                    sys.stdout.flush()
+                if not shell.recv_ready():
+                    break
+            for match in _EVENT_RE.finditer(buf, scan_from):
+                scanned = match.end()
+                if match.lastgroup == "prompt":
+                    error_open = False
+                    continue
+                line_end = buf.find(b"\n", match.end())
+                end = len(buf) if line_end < 0 else line_end + 1
+                # Further "Error" lines before the next prompt belong to the same failed
+                # statement, so they extend its output instead of counting as another one
+                is_error = match.group("done").startswith(b"Error")
+                if is_error and error_open:
+                    ends[-1] = end
+                    continue
+                error_open = is_error
+                ends.append(end)
+            if len(ends) > expected:
+                break  # More statements ran than were sent as separate ones
+            if len(ends) == expected:
+                if prompt_deadline is None:
+                    alert()
+                    prompt_deadline = time.time() + _PROMPT_WAIT
+                if _IDLE_RE.search(buf, ends[-1]):
+                    session_usable = not channel_closed
+                    break
+            if channel_closed:
+                break
+    finally:
+        sel.unregister(shell.fileno())
+        sel.close()
+        if not session_usable:
+            close_session()
+    return buf, ends[:expected]
+
+
+def _log_query(sql_query, query_output, rows):
+    """Append a query and its result to today's log file and return the file path."""
+    now = datetime.datetime.now()
+    logs_dir = os.path.normpath(os.path.expanduser("~/pb_logs"))
+    current_year = str(now.year)
+    current_month = f"{now.month:02d}"
+    year_dir = os.path.join(logs_dir, current_year)
+    month_dir = os.path.join(year_dir, current_month)
+    if month_dir not in _ensured_dirs:
+        os.makedirs(month_dir, exist_ok=True)
+        _ensured_dirs.add(month_dir)
+    today_date = f"{current_year}_{current_month}_{now.day:02d}"
+    log_file_path = os.path.join(month_dir, f"logs_{today_date}.txt")
+
+    log_file = _log_file(log_file_path)
+    timestamp = now.isoformat(sep=" ", timespec="seconds")
+    rule = "-" * 70
+    log_file.write(
+        f"\n\n{rule}\n{timestamp}\n{rule}\n"
+        f"\n{sql_query}\n\n"
+        f"{query_output}\n{rows}\n"
+    )
+    log_file.flush()
+    return log_file_path
+
+
+def run_sql(sql_query, queue_name=None, io=True, timeout=0, log_enabled=True, cache=False, stream=False):
     sql_query = clean_sql(sql_query)
+
+    # Serve repeated read-only queries from the result cache when requested
+    cache_key = _cache_key(sql_query) if cache else None
+    if cache_key is not None:
+        cached = _cache_get(cache_key)
+        if cached is not None:
+            query_output, rows = cached
+            if io:
+                print(query_output)
+                if rows:
+                    print(rows)
+            return query_output, rows
+
+    if queue_name is None:
+        queue_name = _cfg().get("DEFAULT_QUEUE", "")
+
+    shell = _get_shell(queue_name)
+
+    # Send each statement on its own and wait for all of them, so none is still running
+    # (and its output still unread) when the session is reused; only the first is returned
+    statements = _split_statements(sql_query) or [sql_query]
+
     while shell.recv_ready():
         shell.recv(65535)
-    shell.send(sql_query + "\n;\n")
+    shell.send("".join(statement + "\n;\n" for statement in statements))
 
-    output = ''
-    start_time = time.time()
-    while True:
-        if timeout > 0 and time.time() - start_time > timeout:
-            print("Timeout reached, exiting loop.")
-            alert()
-            break
-        if shell.recv_ready():
-            new_data = shell.recv(65535).decode('utf-8')
-            output += new_data
-            if any(x in new_data for x in ["rows selected", "No rows selected", "row selected", "Error"]):
-                alert()
-                break
-        else:
-            time.sleep(0.001)
+    # When streaming, echo each chunk as it arrives; the incremental decoder keeps
+    # multi-byte characters that are split across chunks intact
+    stream = io and stream
+    stream_decoder = codecs.getincrementaldecoder('utf-8')(errors='replace') if stream else None
+    buf, ends = _read_results(shell, expected=len(statements), timeout=timeout,
+                              stream_decoder=stream_decoder)
 
-    query_output, rows = extract_query_output(output)
+    # Anything after the first completion marker belongs to another statement
+    query_output, rows = extract_query_output(buf[:ends[0]] if ends else buf)
+    failed = len(ends) < len(statements) or b"Error" in buf
+    _track_statement(sql_query, shell, failed)
+    if cache_key is not None and not failed:
+        # _get_shell may have opened a new session (resetting the current database)
+        # since the lookup key was computed, so store under the key for this session
+        _cache_put(_cache_key(sql_query), query_output, rows)
 
     log_file_path = None
     if log_enabled:
-        logs_dir = os.path.normpath(os.path.expanduser("~/pb_logs"))
-        current_year = datetime.datetime.now().strftime("%Y")
-        current_month = datetime.datetime.now().strftime("%m")
-        year_dir = os.path.join(logs_dir, current_year)
-        month_dir = os.path.join(year_dir, current_month)
-        os.makedirs(month_dir, exist_ok=True)
-        today_date = datetime.datetime.now().strftime("%Y_%m_%d")
-        log_file_path = os.path.join(month_dir, f"logs_{today_date}.txt")
-
-        with open(log_file_path, "a", encoding="utf-8") as log_file:
-            timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            log_file.write("\n\n" + "-" * 70 + "\n")
-            log_file.write(f"{timestamp}\n")
-            log_file.write("-" * 70 + "\n")
-            log_file.write("\n" + sql_query + "\n\n")
-            log_file.write(query_output + "\n" + rows + "\n")
-
-    if "Error" in output and log_file_path:
+        log_file_path = _log_query(sql_query, query_output, rows)
+
+    if b"Error" in buf and log_file_path:
         file_name_only = os.path.basename(log_file_path)
         error_message_html = f"""
         <p>An error occurred, click to see the logs: 
         <a href='{log_file_path}' target='_blank'>{file_name_only}</a></p>
         """
 
-    if io:
+    if io and not stream:
         print(query_output)
         if rows:
             print(rows)
 
-    ssh_client.close()
-    time.sleep(0.5)
-
     return query_output, rows
+
+
+# Consecutive single-table INSERT ... VALUES statements are merged up to this many characters
+_BATCH_INSERT_LIMIT = 65536
+
+_INSERT_VALUES_RE = re.compile(
+    r"^insert\s+into\s+(?:table\s+)?([\w.`]+(?:\s*\([^)]*\))?)\s+values\s*(.+)$",
+    re.IGNORECASE | re.DOTALL,
+)
+
+
+# One statement: quoted strings, backtick names and "--" comments may contain ";"
+_STATEMENT_RE = re.compile(
+    r"""(?:'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*"|`[^`]*`|--[^\n]*|[^;'"`-]|-|['"`])+"""
+)
+
+
+def _split_statements(sql):
+    """Split SQL text on the ";" separators that are not inside quotes or comments."""
+    return [statement.strip() for statement in _STATEMENT_RE.findall(sql) if statement.strip()]
+
+
+def _merge_inserts(statements):
+    """
+    Merge consecutive `INSERT INTO t VALUES (...)` statements for the same table (and
+    column list) into one multi-row INSERT, keeping each merged statement under
+    _BATCH_INSERT_LIMIT characters.
+    """
+    merged = []
+    target = None  # Normalized "table (columns)" of the INSERT at merged[-1], if any
+    for statement in statements:
+        match = _INSERT_VALUES_RE.match(statement)
+        key = re.sub(r"\s+", "", match.group(1)).lower() if match else None
+        # A "--" comment on the previous statement's last line would swallow appended rows
+        if (key is not None and key == target
+                and "--" not in merged[-1].rsplit("\n", 1)[-1]
+                and len(merged[-1]) + len(match.group(2)) + 1 <= _BATCH_INSERT_LIMIT):
+            merged[-1] = f"{merged[-1].rstrip()},{match.group(2).strip()}"
+        else:
+            merged.append(statement)
+            target = key
+    return merged
+
+
+def run_sql_batch(sql_queries, queue_name=None, io=True, timeout=0, log_enabled=True):
+    """
+    Execute several SQL statements in one Beeline session with a single send, so the
+    SSH round trip and session setup are paid once for the whole batch.
+
+    Consecutive `INSERT INTO <table> VALUES (...)` statements for the same table are
+    merged into one multi-row INSERT before sending.
+
+    Args:
+        sql_queries (list of str): SQL statements to execute, in order. An element may
+            hold several ";"-separated statements; each is run and returned separately.
+        queue_name (str, optional): YARN queue name. Defaults to DEFAULT_QUEUE from the config.
+        io (bool): If True, prints each statement's output.
+        timeout (int): Maximum seconds to wait for the whole batch. 0 means no timeout.
+        log_enabled (bool): If True, logs each statement and its output.
+
+    Returns:
+        list: One (query_output, rows) tuple per executed statement (after splitting
+              and merging).
+              Statements that did not complete before a timeout are left out.
+    """
+    # Send every statement on its own so each one produces exactly one completion marker
+    statements = [statement for sql in sql_queries for statement in _split_statements(clean_sql(sql))]
+    statements = _merge_inserts(statements)
+    if not statements:
+        return []
+
+    if queue_name is None:
+        queue_name = _cfg().get("DEFAULT_QUEUE", "")
+
+    shell = _get_shell(queue_name)
+
+    while shell.recv_ready():
+        shell.recv(65535)
+    shell.send("".join(sql + "\n;\n" for sql in statements))
+
+    buf, ends = _read_results(shell, expected=len(statements), timeout=timeout)
+
+    # Each statement's output runs up to the end of its completion marker line
+    results = []
+    start = 0
+    for sql_query, end in zip(statements, ends):
+        query_output, rows = extract_query_output(buf[start:end])
+        _track_statement(sql_query, shell, b"Error" in buf[start:end])
+        start = end
+        if log_enabled:
+            _log_query(sql_query, query_output, rows)
+        if io:
+            print(query_output)
+            if rows:
+                print(rows)
+        results.append((query_output, rows))
+
+    # Statements that did not complete may still have run
+    for sql_query in statements[len(ends):]:
+        _track_statement(sql_query, shell, True)
+
+    return results
@@ -12,7 +12,7 @@ from tkinter import Tk, filedialog, messagebox
 
 from .utils import alert, text_to_df
 from .config import WINSCP_CONFIG, BEELINE_CONFIG
-from .core import run_sql
+from .core import run_sql, parse_beeline_table
 from .ssh import run_shell, run_shell_blocking
 
 
@@ -330,7 +330,7 @@ def table_to_df(table_name):
         print("1. Fetching column headers", end="")
         schema_query = f"DESCRIBE {table_name}"
         output, _ = run_sql(schema_query, io=0)
-        df = text_to_df(output)
+        df = parse_beeline_table(output)
         header_row = ','.join(df['col_name'].astype(str).tolist())
         print_done("1. Fetching column headers")
 
@@ -119,6 +119,10 @@ def daypartitions_to_sec(day_list):
     return [int(time.mktime(time.strptime(day, "%Y%m%d"))) for day in day_list]
 
 
+# Beeline table border lines, e.g. "+-----+------+"
+_DIVIDER_RE = re.compile(r'^[\+\-]+$', re.UNICODE)
+
+
 def text_to_df(output):
     """
     Convert raw text output from Beeline SQL execution into a Pandas DataFrame.
@@ -130,23 +134,23 @@ def text_to_df(output):
         pd.DataFrame: DataFrame representation of the query result.
     """
     lines = output.strip().splitlines()
-    divider_regex = re.compile(r'^[\+\-]+$', re.UNICODE)
     processed_lines = []
     header = None
     counter = 1
 
     for line in lines:
-        if divider_regex.match(line.strip()) and counter == 1:
+        is_divider = _DIVIDER_RE.match(line.strip()) is not None
+        if is_divider and counter == 1:
             counter += 1
             continue
         if counter == 2:
             counter += 1
             header = [col.strip() for col in line.strip('| ').split(' | ')]
             continue
-        if divider_regex.match(line.strip()) and counter == 3:
+        if is_divider and counter == 3:
             counter += 1
             continue
-        if divider_regex.match(line.strip()) and counter == 4:
+        if is_divider and counter == 4:
             counter = 2
             continue
         else:
@@ -291,6 +295,10 @@ def set_env(interactive=True):
     with open(path, "w") as f:
         json.dump(config, f, indent=4)
 
+    # Drop the cached Beeline config so the next query picks up the new values
+    from .core import _cfg
+    _cfg.cache_clear()
+
     print(f"✅ Configuration saved to:\n{path}")
     print("You can manually edit this file later to update any values.")
 